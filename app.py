@@ -1,3 +1,7 @@
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+
 import streamlit as st
 
 # --- Page Configuration ---
@@ -7,7 +11,57 @@ st.set_page_config(
     layout="centered"
 )
 
+# --- Static Content ---
+# Built once at import; reruns re-send the same objects instead of
+# reallocating the strings each time.
+
+_HEADER_HTML = """
+<div style='background-color: #1e3a8a; padding: 20px; border-radius: 10px; margin-bottom: 20px;'>
+    <h1 style='color: white; margin: 0;'>Sanford Kidney Transplant</h1>
+    <p style='color: #bfdbfe; margin: 0;'>Self-Referral Eligibility Screener (Fargo, ND)</p>
+</div>
+"""
+
+_INFO_BANNER = "ℹ️ This form assesses potential eligibility based on standard transplant guidelines. It is not a medical diagnosis."
+
+_CALL_CARD = """
+**📞 Call to Self-Refer:**
+
+**(701) 234-6715**
+
+or (701) 234-3360
+"""
+
+_LOCATION_CARD = """
+**📍 Location:**
+
+**Sanford Broadway Medical Building**
+
+736 Broadway N, Fargo, ND 58102
+"""
+
 # --- Logic Helper Functions ---
+
+@dataclass(frozen=True)
+class Inputs:
+    """Frozen snapshot of the questionnaire answers.
+
+    Immutable + hashable so `st.cache_data` can memoize eligibility
+    checks when the same answers are re-submitted.
+    """
+    age: int
+    on_dialysis: str
+    gfr: float | None
+    active_cancer: bool
+    active_infection: bool
+    substance_abuse: bool
+    heart_lung_disease: bool
+    social_support: bool
+
+
+# Pure arithmetic, so a plain lru_cache is cheaper than st.cache_data's
+# hasher; reruns with unchanged measurements become a dict lookup.
+@lru_cache(maxsize=512)
 def calculate_bmi(height_ft, height_in, weight_lbs):
     if height_ft and weight_lbs:
         total_inches = (height_ft * 12) + height_in
@@ -16,64 +70,127 @@ def calculate_bmi(height_ft, height_in, weight_lbs):
             return round(bmi, 1)
     return None
 
-def determine_eligibility(data, bmi):
-    status = 'eligible'
-    messages = []
-    
+# Severity levels index into _STATUSES; final status is the max severity hit.
+_INELIGIBLE = 2
+_CONDITIONAL = 1
+# Interned so the status comparisons in render_results are pointer compares.
+STATUS_ELIGIBLE = sys.intern('eligible')
+STATUS_CONDITIONAL = sys.intern('conditional')
+STATUS_INELIGIBLE = sys.intern('ineligible')
+_STATUSES = (STATUS_ELIGIBLE, STATUS_CONDITIONAL, STATUS_INELIGIBLE)
+
+# Rule messages, allocated once at import. The BMI ones are bound .format
+# templates since they embed the computed value.
+_MSG_CANCER = "Active malignancy (cancer) is typically a contraindication. Generally, you must be cancer-free for a specific period (often 2-5 years) before being listed."
+_MSG_INFECTION = "Active systemic infections must be fully treated and resolved before transplantation can proceed."
+_MSG_SMOKING = "Active smoking > 1 pack per day is a contraindication. Programs typically requires 6 months of abstinence."
+_MSG_HEART_LUNG = "Severe heart or lung disease requires a detailed clearance by a specialist to ensure you are healthy enough for surgery."
+_MSG_BMI_40 = "Your calculated BMI is {bmi}. A BMI over 40 may delay listing. The team may work with you on a weight loss plan prior to surgery.".format
+_MSG_BMI_35 = "Your calculated BMI is {bmi}. While eligible, a BMI over 35 carries higher surgical risks.".format
+_MSG_AGE = "While there is no strict age limit, candidates over 75 undergo a more rigorous evaluation to ensure they can tolerate the surgery and medication."
+_MSG_SUPPORT = "Post-transplant care requires a dedicated support person. You will need to identify a support system to be listed."
+_MSG_GFR = "Typically, patients are listed for transplant when GFR drops below 20. If your GFR is between 20-30, you can still be evaluated, but waiting time may not accrue yet."
+
+# Flattened rule table, frozen at import: (predicate, severity, message).
+# Predicates take (inputs, bmi); a callable message is formatted with bmi.
+# Hard stops come first so the evaluation loop can bail out before the
+# conditional rules, matching the original two-phase check.
+_RULES = (
     # 1. HARD STOPS (Likely Ineligible)
-    if data['active_cancer']:
-        status = 'ineligible'
-        messages.append("Active malignancy (cancer) is typically a contraindication. Generally, you must be cancer-free for a specific period (often 2-5 years) before being listed.")
-    
-    if data['active_infection']:
-        status = 'ineligible'
-        messages.append("Active systemic infections must be fully treated and resolved before transplantation can proceed.")
-        
-    if data['substance_abuse']:
-        status = 'ineligible'
-        messages.append("Active smoking > 1 pack per day is a contraindication. Programs typically requires 6 months of abstinence.")
-
+    (lambda d, bmi: d.active_cancer, _INELIGIBLE, _MSG_CANCER),
+    (lambda d, bmi: d.active_infection, _INELIGIBLE, _MSG_INFECTION),
+    (lambda d, bmi: d.substance_abuse, _INELIGIBLE, _MSG_SMOKING),
     # 2. CONDITIONAL / WARNINGS
-    if status != 'ineligible':
-        if data['heart_lung_disease']:
-            status = 'conditional'
-            messages.append("Severe heart or lung disease requires a detailed clearance by a specialist to ensure you are healthy enough for surgery.")
-        
-        if bmi:
-            if bmi > 40:
-                status = 'conditional'
-                messages.append(f"Your calculated BMI is {bmi}. A BMI over 40 may delay listing. The team may work with you on a weight loss plan prior to surgery.")
-            elif bmi > 35:
-                status = 'conditional'
-                messages.append(f"Your calculated BMI is {bmi}. While eligible, a BMI over 35 carries higher surgical risks.")
-
-        if data['age'] and data['age'] > 75:
-            status = 'conditional'
-            messages.append("While there is no strict age limit, candidates over 75 undergo a more rigorous evaluation to ensure they can tolerate the surgery and medication.")
-
-        if data['social_support'] == "No / Unsure":
-            status = 'conditional'
-            messages.append("Post-transplant care requires a dedicated support person. You will need to identify a support system to be listed.")
-
-        # Kidney Function Check
-        if data['on_dialysis'] == "No":
-            if data['gfr'] and data['gfr'] > 20:
-                status = 'conditional'
-                messages.append("Typically, patients are listed for transplant when GFR drops below 20. If your GFR is between 20-30, you can still be evaluated, but waiting time may not accrue yet.")
-
-    return status, messages
+    (lambda d, bmi: d.heart_lung_disease, _CONDITIONAL, _MSG_HEART_LUNG),
+    (lambda d, bmi: bmi and bmi > 40, _CONDITIONAL, _MSG_BMI_40),
+    (lambda d, bmi: bmi and 35 < bmi <= 40, _CONDITIONAL, _MSG_BMI_35),
+    (lambda d, bmi: d.age and d.age > 75, _CONDITIONAL, _MSG_AGE),
+    (lambda d, bmi: not d.social_support, _CONDITIONAL, _MSG_SUPPORT),
+    # Kidney Function Check
+    (lambda d, bmi: d.on_dialysis == "No" and d.gfr and d.gfr > 20, _CONDITIONAL, _MSG_GFR),
+)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def determine_eligibility(inputs, bmi):
+    severity = 0
+    messages = []
+
+    for predicate, rule_severity, message in _RULES:
+        # A hard stop suppresses the conditional warnings, as before.
+        if severity == _INELIGIBLE and rule_severity < _INELIGIBLE:
+            break
+        if predicate(inputs, bmi):
+            messages.append(message(bmi=bmi) if callable(message) else message)
+            if rule_severity > severity:
+                severity = rule_severity
+
+    # Immutable so cache hits can hand back the same object without copies
+    return _STATUSES[severity], tuple(messages)
+
+# --- Cache Observability (dev only, enable with ?debug=1) ---
+
+def _cache_stats_rows():
+    info = calculate_bmi.cache_info()
+    rows = [{'cache': 'calculate_bmi', 'hits': info.hits, 'misses': info.misses}]
+    # st.cache_data stats are not a stable public API; pick them up if present.
+    get_stats = getattr(st.cache_data, 'get_stats', None)
+    if get_stats is not None:
+        rows.extend(
+            {'cache': s.cache_name, 'hits': s.cache_hit_count, 'misses': s.cache_miss_count}
+            for s in get_stats()
+        )
+    return rows
+
+def _render_cache_stats():
+    with st.expander("cache stats"):
+        st.table(_cache_stats_rows())
 
 # --- UI Functions ---
 
 def render_header():
-    st.markdown("""
-    <div style='background-color: #1e3a8a; padding: 20px; border-radius: 10px; margin-bottom: 20px;'>
-        <h1 style='color: white; margin: 0;'>Sanford Kidney Transplant</h1>
-        <p style='color: #bfdbfe; margin: 0;'>Self-Referral Eligibility Screener (Fargo, ND)</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    st.info("ℹ️ This form assesses potential eligibility based on standard transplant guidelines. It is not a medical diagnosis.")
+    st.markdown(_HEADER_HTML, unsafe_allow_html=True)
+    st.info(_INFO_BANNER)
+
+@st.fragment
+def _bmi_fragment():
+    """Body-measurement widgets plus the live BMI readout.
+
+    Runs as a fragment so typing a height/weight only reruns this
+    subtree; main() reads the result from st.session_state.
+    """
+    st.subheader("⚖️ Body Measurements")
+    col1, col2 = st.columns(2)
+    with col1:
+        height_ft = st.selectbox("Height (Feet)", options=[4, 5, 6, 7], index=None, key="height_ft")
+    with col2:
+        height_in = st.selectbox("Height (Inches)", options=list(range(0, 12)), index=None, key="height_in")
+
+    weight = st.number_input("Weight (lbs)", min_value=0, step=1, value=None, key="weight")
+
+    # Live BMI Calc
+    current_bmi = calculate_bmi(height_ft, height_in if height_in is not None else 0, weight)
+    st.session_state.current_bmi = current_bmi
+    if current_bmi:
+        color = "red" if current_bmi > 40 else ("orange" if current_bmi > 35 else "green")
+        st.markdown(f"**Calculated BMI:** :{color}[{current_bmi}]")
+
+    # The submit button's disabled state lives outside this fragment, so
+    # escalate to a full rerun whenever measurement completeness flips;
+    # keystrokes that don't change validity stay fragment-scoped.
+    complete = height_ft is not None and weight is not None
+    if complete != st.session_state.get('measurements_complete', False):
+        st.session_state.measurements_complete = complete
+        st.rerun(scope="app")
+
+@st.fragment
+def _history_fragment():
+    st.subheader("🩺 Medical History")
+    st.caption("Check any conditions that **currently** apply to you:")
+
+    st.checkbox("Active Cancer / Malignancy", key="active_cancer")
+    st.checkbox("Active Infection (requiring antibiotics)", key="active_infection")
+    st.checkbox("Active Smoker > 1 pack per day", key="substance_abuse")
+    st.checkbox("Severe Heart or Lung Disease (e.g., COPD requiring O2)", key="heart_lung_disease")
 
 def render_results():
     result = st.session_state.result
@@ -83,15 +200,15 @@ def render_results():
     st.subheader("Screening Results")
 
     # Display Status Box
-    if status == 'eligible':
+    if status == STATUS_ELIGIBLE:
         st.success("## ✅ Likely Eligible for Evaluation")
         st.write("Based on your responses, you appear to meet the initial screening criteria for a kidney transplant evaluation at Sanford Fargo.")
-    
-    elif status == 'conditional':
+
+    elif status == STATUS_CONDITIONAL:
         st.warning("## ⚠️ Conditional Eligibility")
         st.write("You may be eligible, but there are specific factors (BMI, age, or medical history) that the transplant team will need to evaluate closely.")
-        
-    elif status == 'ineligible':
+
+    elif status == STATUS_INELIGIBLE:
         st.error("## ❌ Likely Ineligible at this time")
         st.write("Based on standard transplant guidelines, there are contraindications present that typically prevent listing.")
 
@@ -106,7 +223,7 @@ def render_results():
     st.markdown("---")
     st.markdown("### ❤️ Next Steps")
     
-    if status == 'ineligible':
+    if status == STATUS_INELIGIBLE:
         st.write("Please speak with your primary doctor or nephrologist to manage the conditions listed above. If your situation changes (e.g., cancer remission, infection cleared), you can re-apply.")
     else:
         st.write("You do **not** need a doctor's referral to start the process. You can self-refer by contacting the Sanford Transplant Center directly.")
@@ -114,23 +231,13 @@ def render_results():
         # Contact Card
         col1, col2 = st.columns(2)
         with col1:
-            st.info("""
-            **📞 Call to Self-Refer:**
-            
-            **(701) 234-6715**
-            
-            or (701) 234-3360
-            """)
+            st.info(_CALL_CARD)
         with col2:
-            st.info("""
-            **📍 Location:**
-            
-            **Sanford Broadway Medical Building**
-            
-            736 Broadway N, Fargo, ND 58102
-            """)
+            st.info(_LOCATION_CARD)
 
     if st.button("Start Over"):
+        # Dump the counters to stderr so usage traces survive the reset
+        print(f"cache stats: {_cache_stats_rows()}", file=sys.stderr)
         st.session_state.result = None
         st.rerun()
 
@@ -140,11 +247,14 @@ def main():
     if 'result' not in st.session_state:
         st.session_state.result = None
 
+    if st.query_params.get('debug') == '1':
+        _render_cache_stats()
+
     # If results exist, show them (and hide form)
     if st.session_state.result:
         render_header()
         render_results()
-        return
+        st.stop()
 
     # --- Render Form ---
     render_header()
@@ -167,31 +277,15 @@ def main():
         st.divider()
 
         # 3. Body Measurements (BMI)
-        st.subheader("⚖️ Body Measurements")
-        col1, col2 = st.columns(2)
-        with col1:
-            height_ft = st.selectbox("Height (Feet)", options=[4, 5, 6, 7], index=None)
-        with col2:
-            height_in = st.selectbox("Height (Inches)", options=list(range(0, 12)), index=None)
-            
-        weight = st.number_input("Weight (lbs)", min_value=0, step=1, value=None)
-
-        # Live BMI Calc
-        current_bmi = calculate_bmi(height_ft, height_in if height_in is not None else 0, weight)
-        if current_bmi:
-            color = "red" if current_bmi > 40 else ("orange" if current_bmi > 35 else "green")
-            st.markdown(f"**Calculated BMI:** :{color}[{current_bmi}]")
+        _bmi_fragment()
+        height_ft = st.session_state.get('height_ft')
+        weight = st.session_state.get('weight')
+        current_bmi = st.session_state.get('current_bmi')
 
         st.divider()
 
         # 4. Medical History
-        st.subheader("🩺 Medical History")
-        st.caption("Check any conditions that **currently** apply to you:")
-        
-        active_cancer = st.checkbox("Active Cancer / Malignancy")
-        active_infection = st.checkbox("Active Infection (requiring antibiotics)")
-        substance_abuse = st.checkbox("Active Smoker > 1 pack per day")
-        heart_lung_disease = st.checkbox("Severe Heart or Lung Disease (e.g., COPD requiring O2)")
+        _history_fragment()
 
         st.divider()
 
@@ -206,27 +300,25 @@ def main():
         st.divider()
 
         # Validate Button
-        form_valid = True
-        if age is None or height_ft is None or weight is None or on_dialysis is None or social_support is None:
-            form_valid = False
-        
-        if on_dialysis == "No" and (gfr is None or gfr == 0):
-            form_valid = False
+        form_valid = (
+            None not in (age, height_ft, weight, on_dialysis, social_support)
+            and (on_dialysis == "Yes" or gfr not in (None, 0))
+        )
 
         if st.button("Check Eligibility", type="primary", use_container_width=True, disabled=not form_valid):
             # Compile Data
-            data = {
-                'age': age,
-                'on_dialysis': on_dialysis,
-                'gfr': gfr,
-                'active_cancer': active_cancer,
-                'active_infection': active_infection,
-                'substance_abuse': substance_abuse,
-                'heart_lung_disease': heart_lung_disease,
-                'social_support': social_support == "Yes"
-            }
-            
-            status, messages = determine_eligibility(data, current_bmi)
+            inputs = Inputs(
+                age=age,
+                on_dialysis=on_dialysis,
+                gfr=gfr,
+                active_cancer=st.session_state.active_cancer,
+                active_infection=st.session_state.active_infection,
+                substance_abuse=st.session_state.substance_abuse,
+                heart_lung_disease=st.session_state.heart_lung_disease,
+                social_support=social_support == "Yes"
+            )
+
+            status, messages = determine_eligibility(inputs, current_bmi)
             st.session_state.result = {'status': status, 'messages': messages}
             st.rerun()
             